@@ -1,11 +1,14 @@
 from collections import abc
 
-import collections
+import os
+import operator
+import functools
 import itertools
-from typing import Union
+from typing import Optional, Union
 
 import sqlalchemy as sa
 import sqlalchemy.orm.strategies
+import sqlalchemy.dialects.postgresql as pg
 
 from jessiql.sautil.adapt import SimpleColumnsAdapter
 from jessiql.typing import SAModelOrAlias, SARowDict
@@ -21,13 +24,33 @@ from jessiql.sainfo.version import SA_13, SA_14
 
 # Inspired by SelectInLoader._load_for_path()
 # With some differences;
-# * We do no streaming: all parent FKs are available at once, so we don't care about `order_by`s
+# * We do not stream parents: all parent FKs are available at once, so we don't care about `order_by`s
+#   (related rows, however, can optionally be streamed from a server-side cursor: see `stream_results`)
 # * We don't use baked queries for now
 # * Some customizations are marked with [CUSTOMIZED]
 # * Some additions are marked with [ADDED]
 # * Anchor lines in the original SqlAlchemy code marked [o] with original code samples provided
 
 
+def _chunksize_from_env(name: str, default: int) -> int:
+    """ Get the default chunk size from an environment variable
+
+    Fails with a message that names the variable: a bare ValueError from int() is hard to trace back to its cause.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+
+    try:
+        chunksize = int(value)
+    except ValueError:
+        chunksize = 0
+
+    if chunksize <= 0:
+        raise ValueError(f'Environment variable {name} must be a positive integer, got: {value!r}')
+    return chunksize
+
+
 class JSelectInLoader:
     """ Loader for related objects, borrowing the approach from SqlAlchemy's SelectInLoader
 
@@ -38,13 +61,16 @@ class JSelectInLoader:
     * `prepare_query()` adds required fields to the SELECT statements
     * `fetch_results_and_populate_states()` populates existing objects ("states") with loaded relation fields
     """
-    def __init__(self, source_model: SAModelOrAlias, relation_property: sa.orm.RelationshipProperty, target_model: SAModelOrAlias):
+    def __init__(self, source_model: SAModelOrAlias, relation_property: sa.orm.RelationshipProperty, target_model: SAModelOrAlias, chunksize: Optional[int] = None, pg_any_array: bool = False, stream_results: bool = False):
         """
 
         Args:
             source_model: The parent model. Its objects have already been loaded.
             relation_property: The joined relationship: the one that should be loaded
             target_model: The model that the relationship points to.
+            chunksize: How many related objects to load with one IN(...) query. Default: $JESSIQL_SELECTIN_CHUNKSIZE, or `CHUNKSIZE`
+            pg_any_array: PostgreSQL only. Use `= ANY(:array)` instead of `IN(...)` for single-column keys
+            stream_results: Fetch related rows from a server-side cursor, `YIELD_PER` rows at a time
         """
         # Models (or aliases)
         self.source_model = source_model
@@ -61,16 +87,60 @@ class JSelectInLoader:
         # Use `SelectInLoader` to produce `query_info` for us. We'll reuse it.
         self.loader = sa.orm.strategies.SelectInLoader(relation_property, ())
 
+        # [ADDED] Chunk size for this relationship
+        # The optimal value depends on the database: some handle long IN(...) lists better than others
+        # The environment variable is read here, not at import time: a typo in it should not break `import jessiql`
+        if chunksize is None:
+            chunksize = _chunksize_from_env('JESSIQL_SELECTIN_CHUNKSIZE', default=self.CHUNKSIZE)
+        if isinstance(chunksize, bool) or not isinstance(chunksize, int) or chunksize <= 0:
+            raise ValueError(f'Chunk size must be a positive integer, got: {chunksize!r}')
+        self.chunksize = chunksize
+
+        # [ADDED] PostgreSQL: pass primary keys as an array
+        self.pg_any_array = pg_any_array
+
+        # [ADDED] Stream related rows from a server-side cursor?
+        self.stream_results = stream_results
+
         # Prefix for columns that we add to the query
         # Typically: "tablename.". Yes, with a period.
         self.fk_label_prefix = ''
 
+        # [ADDED] Adapt pk_cols
+        # They only depend on the relationship and the target model: adapt them once, not for every statement
+        query_info = self.loader._query_info
+
+        # [o] pk_cols = query_info.pk_cols
+        # [o] in_expr = query_info.in_expr
+        self.pk_cols: tuple[sa.sql.ColumnElement, ...] = tuple(query_info.pk_cols)
+        self.in_expr: sa.sql.ColumnElement = query_info.in_expr
+
+        # [o] if not query_info.load_with_join:
+        if not query_info.load_with_join:
+            # [o] if effective_entity.is_aliased_class:
+            # [o]     pk_cols = [ effective_entity._adapt_element(col) for col in pk_cols ]
+            # [o]     in_expr = effective_entity._adapt_element(in_expr)
+            adapter = _adapter_for(self.target_model)
+            self.pk_cols = tuple(adapter.replace_many(self.pk_cols))
+            self.in_expr = adapter.replace(self.in_expr)
+
+        # [ADDED] Compiled statements, reused by all chunks
+        # SA 1.3 only: SA 1.4 has its own engine-wide cache. See `fetch_results_and_populate_states()`
+        self.compiled_cache: Optional[dict] = {} if SA_13 else None
+
+        # [ADDED] Primary key getter for states. The list of columns is fixed: build it once, use for every state
+        self.source_pk_getter = tuple_getter([col.key for col in self.source_mapper.primary_key])
+
     __slots__ = (
         'source_model', 'target_model',
         'source_mapper', 'target_mapper',
         'relation_property', 'key',
         'loader',
+        'chunksize', 'pg_any_array', 'stream_results',
+        'pk_cols', 'in_expr',
         'fk_label_prefix',
+        'source_pk_getter',
+        'compiled_cache',
         'our_states', 'none_states',
     )
 
@@ -114,21 +184,27 @@ class JSelectInLoader:
         # [o] if query_info.load_only_child:
         if query_info.load_only_child:
             # [o] our_states = collections.defaultdict(list)
-            self.our_states = collections.defaultdict(list)
+            # [CUSTOMIZED] a plain dict: one list per unique key, no `defaultdict.__missing__` dispatch
+            our_states: dict[tuple, list[SARowDict]] = {}
+            self.our_states = our_states
             self.none_states = []
 
+            # [ADDED] Foreign key getter: the list of columns is the same for every state
+            get_related_ident = tuple_getter([lk.key for lk in query_info.child_lookup_cols])
+
             # [o] for state, overwrite in states:
             for state_dict in states:
                 # [o] related_ident = tuple(...)
-                related_ident = tuple(
-                    state_dict[lk.key]
-                    for lk in query_info.child_lookup_cols
-                )
+                related_ident = get_related_ident(state_dict)
 
                 # organize states into lists keyed to particular foreign key values.
                 # [o] if None not in related_ident:
                 if None not in related_ident:
-                    self.our_states[related_ident].append(state_dict)
+                    states_for_key = our_states.get(related_ident)
+                    if states_for_key is None:
+                        our_states[related_ident] = [state_dict]
+                    else:
+                        states_for_key.append(state_dict)
                 else:
                     # For FK values that have None, add them to a separate collection that will be populated separately
                     self.none_states.append(state_dict)
@@ -143,9 +219,12 @@ class JSelectInLoader:
         # We need to collect our primary keys.
         # [o] if not query_info.load_only_child:
         if not query_info.load_only_child:
+            # [ADDED] Only MANYTOONE states may have NULL foreign keys
+            self.none_states = []
+
             # If it fails to find a column in `state`, it means the `state` does not have a primary key loaded
             self.our_states = [
-                (get_primary_key_tuple(self.source_mapper, state), state)
+                (self.source_pk_getter(state), state)
                 for state in states
             ]
 
@@ -154,6 +233,10 @@ class JSelectInLoader:
     def prepare_query(self, q: sa.sql.Select) -> sa.sql.Select:
         """ Prepare the statement for loading: add columns to select, add filter condition
 
+        This is a Core statement: it selects columns, not ORM entities. Only the columns chosen by the "select"
+        operation are loaded, plus the keys added here. Rows come back as plain tuples, so no ORM loader strategy
+        (lazy, joined, selectin) is ever triggered, and there is nothing for `raiseload("*")` to prevent.
+
         Args:
             q: SELECT statement prepared by QueryExecutor.statement().
                It has no columns yet, but has a select_from(self.target_model), unaliased.
@@ -166,20 +249,9 @@ class JSelectInLoader:
         parent_alias = self.loader._parent_alias if query_info.load_with_join else NotImplemented
         effective_entity = self.target_model
 
-        # [ADDED] Adapt pk_cols
-        # [o] pk_cols = query_info.pk_cols
-        # [o] in_expr = query_info.in_expr
-        pk_cols = query_info.pk_cols
-        in_expr = query_info.in_expr
-
-        # [o] if not query_info.load_with_join:
-        if not query_info.load_with_join:
-            # [o] if effective_entity.is_aliased_class:
-            # [o]     pk_cols = [ effective_entity._adapt_element(col) for col in pk_cols ]
-            # [o]     in_expr = effective_entity._adapt_element(in_expr)
-            adapter = SimpleColumnsAdapter(self.target_model)
-            pk_cols = adapter.replace_many(pk_cols)
-            in_expr = adapter.replace(in_expr)
+        # [ADDED] Adapted pk_cols: prepared in __init__()
+        pk_cols = self.pk_cols
+        in_expr = self.in_expr
 
         # [o] bundle_ent = orm_util.Bundle("pk", *pk_cols)
         # [o] entity_sql = effective_entity.__clause_element__()
@@ -224,7 +296,12 @@ class JSelectInLoader:
                 )
 
         # [o] q = q.filter(in_expr.in_(sql.bindparam("primary_keys")))
-        if SA_13:
+        # [ADDED] PostgreSQL: `= ANY(:primary_keys)` sends the keys as one array parameter.
+        # A long IN(...) list has one placeholder per key, and the planner may handle it poorly.
+        # Only for single-column keys: tuples won't fit into an array.
+        if self.pg_any_array and query_info.zero_idx:
+            q = q.where(in_expr == sa.any_(sa.sql.bindparam("primary_keys", type_=pg.ARRAY(in_expr.type))))
+        elif SA_13:
             q = q.where(in_expr.in_(sa.sql.bindparam("primary_keys", expanding=True)))
         else:
             q = q.filter(in_expr.in_(sa.sql.bindparam("primary_keys")))
@@ -232,16 +309,46 @@ class JSelectInLoader:
         return q
 
     def fetch_results_and_populate_states(self, connection: sa.engine.Connection, q: sa.sql.Select) -> abc.Iterator[SARowDict]:
-        """ Execute the query, fetch results, populate states """
+        """ Execute the query, fetch results, populate states
+
+        Loaded objects are yielded as they arrive, every object once.
+        NOTE: states are only guaranteed to be fully populated when the iterator is exhausted.
+        """
         query_info = self.loader._query_info
 
+        # [ADDED] Nothing to load? Don't even bother. Common for nested relations of empty parents.
+        # NOTE: states with NULL foreign keys still have to be populated with an empty value
+        if not self.our_states and not self.none_states:
+            return
+
+        # [ADDED] The same statement is executed for every chunk: compile it once, reuse it for other chunks
+        # Only SA 1.3 needs this: SA 1.4 already has an engine-wide LRU cache of compiled statements, which outlives this loader.
+        # SA 1.3 Connection.execution_options() gives a branched connection: the caller's one is not modified.
+        if SA_13:
+            connection = connection.execution_options(compiled_cache=self.compiled_cache)
+
+        # [ADDED] Stream rows from a server-side cursor, buffering at most `YIELD_PER` rows at a time
+        # Opt-in: this bounds the DBAPI buffer for huge chunks, but the loaded rows are kept anyway: in states and in results.
+        # It costs extra roundtrips to the server for every chunk, and with psycopg2 requires a transaction (no AUTOCOMMIT).
+        # Dialects that have no server-side cursors just ignore this option.
+        if self.stream_results:
+            q = q.execution_options(stream_results=True, max_row_buffer=self.YIELD_PER)
+
         if query_info.load_only_child:
             yield from self._load_via_child(connection, self.our_states, self.none_states, q)  # type: ignore[arg-type]
         else:
             yield from self._load_via_parent(connection, self.our_states, q)  # type: ignore[arg-type]
 
     # Chunk size: how many related objects to load at once with one SQL IN(...) query
-    CHUNKSIZE = sa.orm.strategies.SelectInLoader._chunksize  # type: ignore[attr-defined]
+    # This is the default value: override it with the JESSIQL_SELECTIN_CHUNKSIZE environment variable, or per relationship with `chunksize`
+    CHUNKSIZE: int = sa.orm.strategies.SelectInLoader._chunksize  # type: ignore[attr-defined]
+
+    # Row batch size: how many rows are fetched at once (from the server-side cursor, if streaming), and then processed as a batch
+    YIELD_PER = 1000
+
+    # Load MANYTOONE keys in sorted order?
+    # Makes the list of IN(...) parameters deterministic, which is nice for unit tests. Costs a sort.
+    SORTED_KEYS = False
 
     # Used for: ONETOMANY and MANYTOMANY. That is, our primary key is mentioned by the parent entity.
     # Inspired by SelectInLoader._load_via_parent()
@@ -259,31 +366,49 @@ class JSelectInLoader:
         # [o] _empty_result = () if uselist else None
         _empty_result: abc.Callable[[], Union[list, None]] = lambda: [] if uselist else None
 
-        # [o]
-        while our_states:
-            # [o]
-            chunk = our_states[0: self.CHUNKSIZE]
-            our_states = our_states[self.CHUNKSIZE:]
+        # [o] while our_states:
+        # [o]     chunk = our_states[0 : self._chunksize]
+        # [o]     our_states = our_states[self._chunksize :]
+        # [CUSTOMIZED] no copying of the tail of the list for every chunk
+        for chunk in iter_chunks(our_states, self.chunksize):
+            # [o] primary_keys = [key[0] if query_info.zero_idx else key for key, state, state_dict, overwrite in chunk]
+            # [CUSTOMIZED] test `zero_idx` once, not for every key
+            if query_info.zero_idx:
+                primary_keys = [key[0] for key, state_dict in chunk]
+            else:
+                primary_keys = [key for key, state_dict in chunk]
 
-            # [o]
-            primary_keys = [
-                key[0] if query_info.zero_idx else key
-                for key, state_dict in chunk
-            ]
+            # [o] context.session.execute(
+            # [o] q, params={"primary_keys": primary_keys}
+            # [CUSTOMIZED]
+            result = connection.execute(q, {"primary_keys": primary_keys})
+
+            # [ADDED] Column names are the same for every row: resolve them once, then pluck values by index
+            keys = tuple(result.keys())
+            get_fk = tuple_getter([keys.index(self.fk_label_prefix + col.key) for col in query_info.pk_cols])
+            make_row_dict = row_dict_factory(keys, self.fk_label_prefix)
 
             # [o] data = collections.defaultdict(list)
-            data: dict[tuple, list[dict]] = collections.defaultdict(list)
-            for k, v in itertools.groupby(  # type: ignore[call-overload]
-                    # [o] context.session.execute(
-                    # [o] q, params={"primary_keys": primary_keys}
-                    # [CUSTOMIZED]
-                    connection.execute(q, {"primary_keys": primary_keys}),
-                    lambda row: get_foreign_key_tuple(row, query_info.pk_cols, self.fk_label_prefix),  # type: ignore[arg-type]
-            ):
+            # [CUSTOMIZED] a plain dict: most keys get just a few rows, `defaultdict.__missing__` isn't worth it
+            data: dict[tuple, list[dict]] = {}
+            # [o] for k, v in itertools.groupby(...):
+            # [CUSTOMIZED] group in the same pass: rows come in arbitrary order anyway
+            for row in iter_rows_in_batches(result, self.YIELD_PER):
                 # [o] data[k].extend(vv[1] for vv in v)
-                # [CUSTOMIZED] convert MappingResult to an actual, mutable dict() to which we'll add keys
-                data[k].extend(row_without_fk_columns(row, self.fk_label_prefix) for row in v)
+                # [CUSTOMIZED] convert rows to actual, mutable dict() to which we'll add keys
+                row_dict = make_row_dict(row)
+                k = get_fk(row)
+
+                collection = data.get(k)
+                if collection is None:
+                    data[k] = [row_dict]
+                else:
+                    collection.append(row_dict)
 
+                # [ADDED] Return loaded objects
+                # Every row is given exactly once, as it arrives: no need to traverse the collections again
+                # NOTE: yield rows, not collections: with uselist=False, yielding a collection (or None) broke @property handlers
+                yield row_dict
 
             # [o] for key, state, state_dict, overwrite in chunk:
             for key, state_dict in chunk:
@@ -301,12 +426,6 @@ class JSelectInLoader:
                     # [o] state.get_impl(self.key).set_committed_value(state, state_dict, collection)
                     state_dict[self.key] = collection  # [CUSTOMIZED]
 
-                # [ADDED] Return loaded objects
-                if uselist:
-                    yield from collection  # type: ignore[misc]
-                else:
-                    yield collection  # type: ignore[misc]
-
     # Used for: MANYTOONE. That is, we have a foreign key that refers to a parent.
     # Inspired by SelectInLoader._load_via_child()
     # [o] def _load_via_child(self, our_states, none_states, query_info, q, context):
@@ -323,82 +442,125 @@ class JSelectInLoader:
         # [o] uselist = self.uselist
         uselist: bool = self.relation_property.uselist
 
+        # populate none states with empty value / collection
+        # [CUSTOMIZED] Do it once, not for every chunk. Even if there are no chunks at all.
+        # [o] for state, dict_, overwrite in none_states:
+        for state_dict in none_states:
+            # [o] state.get_impl(self.key).set_committed_value(state, dict_, None)
+            # [CUSTOMIZED] uselist=True relationships get an empty list
+            state_dict[self.key] = [] if uselist else None
+
         # this sort is really for the benefit of the unit tests
         # [o] our_keys = sorted(our_states)
-        our_keys = sorted(our_states)
-        # [o]
-        while our_keys:
-            # [o] chunk = our_keys[0 : self._chunksize]
-            # [o] our_keys = our_keys[self._chunksize :]
-            chunk = our_keys[0: self.CHUNKSIZE]
-            our_keys = our_keys[self.CHUNKSIZE:]
-
-            # [o]
-            data = {
-                get_primary_key_tuple(self.target_mapper, row): dict(row)  # type: ignore[arg-type]   # [CUSTOMIZED] Convert mappings into mutable dicts
-                # [o] for k, v in context.session.execute(
-                for row in connection.execute(q, {"primary_keys": [
-                    key[0] if query_info.zero_idx else key
-                    for key in chunk
-                ]})
-            }
-
-            # [o]
+        # [CUSTOMIZED] Production code does not need it: dicts keep insertion order. Opt in with `SORTED_KEYS`
+        our_keys = sorted(our_states) if self.SORTED_KEYS else list(our_states)
+        # [o] while our_keys:
+        # [o]     chunk = our_keys[0 : self._chunksize]
+        # [o]     our_keys = our_keys[self._chunksize :]
+        # [CUSTOMIZED] no copying of the tail of the list for every chunk
+        for chunk in iter_chunks(our_keys, self.chunksize):
+            # [ADDED] Keys that get no row from the database still have to be populated. Do it in advance.
+            # [CUSTOMIZED] uselist=True relationships get an empty list, same as `none_states`
+            # [o] for key in chunk:
+            # [o]     related_obj = data.get(key, None)
             for key in chunk:
-                # [o]
-                related_obj = data.get(key, None)
+                for state_dict in our_states[key]:
+                    state_dict[self.key] = [] if uselist else None
+
+            # [o] primary_keys=[key[0] if query_info.zero_idx else key for key in chunk]
+            # [CUSTOMIZED] test `zero_idx` once, not for every key
+            if query_info.zero_idx:
+                primary_keys = [key[0] for key in chunk]
+            else:
+                primary_keys = list(chunk)
+
+            # [o] for k, v in context.session.execute(
+            result = connection.execute(q, {"primary_keys": primary_keys})
+
+            # [ADDED] Column names are the same for every row: resolve them once, then pluck values by index
+            keys = tuple(result.keys())
+            get_pk = tuple_getter([keys.index(col.key) for col in self.target_mapper.primary_key])
+
+            # [o] data = {k: v for k, v in context.session.execute(...)}
+            # [CUSTOMIZED] No intermediate `data` dict: populate states as rows arrive
+            for row in iter_rows_in_batches(result, self.YIELD_PER):
+                related_obj = dict(zip(keys, row))  # [CUSTOMIZED] Convert rows into mutable dicts
 
                 # [o] for state, dict_, overwrite in our_states[key]:
-                for state_dict in our_states[key]:
+                for state_dict in our_states.get(get_pk(row), ()):
                     # [o] state.get_impl(self.key).set_committed_value(
                     # [o]     related_obj if not uselist else [related_obj],
                     state_dict[self.key] = related_obj if not uselist else [related_obj]
 
-            # populate none states with empty value / collection
-            # [o] for state, dict_, overwrite in none_states:
-            for state_dict in none_states:
-                # [o] state.get_impl(self.key).set_committed_value(state, dict_, None)
-                state_dict[self.key] = None
+                # [ADDED] Return loaded objects
+                yield related_obj
+
 
-            # [ADDED] Return loaded objects
-            yield from data.values()
+@functools.lru_cache(maxsize=256)
+def _adapter_for(target_model: SAModelOrAlias) -> SimpleColumnsAdapter:
+    """ Get a columns adapter for the model
 
+    Every query creates new loaders, but they keep loading the same models: reuse adapters across them.
+    """
+    return SimpleColumnsAdapter(target_model)
 
-def get_primary_key_tuple(mapper: sa.orm.Mapper, row: SARowDict) -> tuple:
-    """ Get the primary key tuple from a row dict
 
-    Args:
-        mapper: the Mapper to get the primary key from
-        row: the dict to pluck from
+def iter_rows_in_batches(result: 'sa.engine.CursorResult', size: int) -> abc.Iterator[SARow]:
+    """ Iterate over result rows, fetching them in batches of `size`
+
+    `fetchmany()` gives a list of rows processed in one call: cheaper than fetching rows one by one.
+    Unlike `fetchall()`, it keeps a streamed result lazy.
+    """
+    return itertools.chain.from_iterable(iter(lambda: result.fetchmany(size), []))
+
+
+def iter_chunks(seq: abc.Sequence, size: int) -> abc.Iterator[abc.Sequence]:
+    """ Split a sequence into chunks of at most `size` items
+
+    A sequence that fits into one chunk is given as is, without copying.
+    An empty sequence gives no chunks at all.
     """
-    return tuple(row[col.key] for col in mapper.primary_key)
+    if not seq:
+        return
+    elif len(seq) <= size:
+        yield seq
+    else:
+        for start in range(0, len(seq), size):
+            yield seq[start: start + size]
 
 
-def get_foreign_key_tuple(row: SARowDict, pk_cols: abc.Iterable[sa.Column], fk_label_prefix: str) -> tuple:
-    """ Get the foreign key tuple from a row dict
+def tuple_getter(keys: abc.Sequence) -> abc.Callable[[Union[abc.Sequence, abc.Mapping]], tuple]:
+    """ Make a function that plucks `keys` from a row and gives a tuple
+
+    Used to get primary/foreign key tuples from rows. The list of keys is fixed, so we prepare it only once.
 
     Args:
-        row: the dict to pluck from
-        query_info: SqlALchemy SelectInLoader.query_info object that contains the necessary information
+        keys: dict keys to pluck from a row dict, or indexes to pluck from a result row
     """
-    return tuple(
-        row[fk_label_prefix + col.key]  # type: ignore[operator]
-        for col in pk_cols
-    )
+    getter = operator.itemgetter(*keys)
 
-def row_without_fk_columns(row: SARow, fk_label_prefix: str) -> dict:
-    """ Get the row, drop qualified columns
+    # itemgetter() with one key gives a scalar. Keys are always tuples: both states and rows must agree
+    if len(keys) == 1:
+        return lambda row: (getter(row),)
+    else:
+        return getter
+
+
+def row_dict_factory(keys: abc.Sequence[str], fk_label_prefix: str) -> abc.Callable[[SARow], dict]:
+    """ Make a function that converts a result row into a dict, dropping qualified columns
 
     JSelectInLoader adds some service columns: these have a special name with a period: "table.column".
-    We will remove such columns using prefix test
+    We will remove such columns using prefix test.
+
+    Args:
+        keys: result column names, in the order they come in a row
+        fk_label_prefix: prefix of the service columns to drop
     """
-    # No prefix? Nothing to strip. Convert the row to dict.
+    # No prefix? Nothing to strip. Zip the row with column names.
     if fk_label_prefix == '':
-        return dict(row)
-    # Prefix? We need to drop some columns
+        return lambda row: dict(zip(keys, row))
+    # Prefix? We need to drop some columns. Decide which ones once, not for every row.
     else:
-        return {
-            k: v
-            for k, v in dict(row).items()
-            if not k.startswith(fk_label_prefix)
-        }
\ No newline at end of file
+        idx = [i for i, k in enumerate(keys) if not k.startswith(fk_label_prefix)]
+        names = [keys[i] for i in idx]
+        return lambda row: dict(zip(names, [row[i] for i in idx]))
@@ -8,6 +8,7 @@
 from __future__ import annotations
 
 from collections import abc
+from typing import Optional
 
 import sqlalchemy as sa
 
@@ -74,10 +75,13 @@ class PrimaryQueryLoader(QueryLoaderBase):
         #   See: https://docs.sqlalchemy.org/en/14/_modules/examples/performance/large_resultsets.html
 
         # Get the result
-        # We use `.mappings()` to convert a list of rows `list[RowMapping]` into a list of dicts `list[dict]`
         res: sa.engine.CursorResult = connection.execute(stmt)
 
-        yield from (dict(row) for row in res)
+        # Convert rows into dicts `list[dict]`
+        # Column names are the same for every row: get them once and zip them with row tuples.
+        # This skips the per-row key lookups that `dict(row)` or `.mappings()` would do
+        keys = tuple(res.keys())
+        yield from (dict(zip(keys, row)) for row in res)
 
 
 class RelatedQueryLoader(QueryLoaderBase):
@@ -85,9 +89,9 @@ class RelatedQueryLoader(QueryLoaderBase):
 
     This loader is used to populate loaded models with related fields.
     """
-    def __init__(self, relation: SelectedRelation, source_Model: SAModelOrAlias, target_Model: SAModelOrAlias):
+    def __init__(self, relation: SelectedRelation, source_Model: SAModelOrAlias, target_Model: SAModelOrAlias, chunksize: Optional[int] = None, pg_any_array: bool = False, stream_results: bool = False):
         # Relies on `JSelectInLoader`: implementation borrowed from SqlAlchemy's SelectInLoader
-        self.loader = JSelectInLoader(source_Model, relation.property, target_Model)
+        self.loader = JSelectInLoader(source_Model, relation.property, target_Model, chunksize=chunksize, pg_any_array=pg_any_array, stream_results=stream_results)
 
     __slots__ = 'loader',
 
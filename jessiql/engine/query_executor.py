@@ -177,7 +177,12 @@ class QueryExecutor:
         self.load_path = source_executor.load_path + (relation.name, unaliased_class(self.Model))
 
         # Replace the loader: use a Related Loader that can populate objects with related fields
-        self.loader = self.RelatedQueryLoader(relation, source_executor.Model, self.Model)
+        self.loader = self.RelatedQueryLoader(
+            relation, source_executor.Model, self.Model,
+            chunksize=self.settings.selectin_chunksize,
+            pg_any_array=self.settings.selectin_pg_any_array,
+            stream_results=self.settings.selectin_stream_results,
+        )
 
         # SkipLimit needs to enter a special pagination mode: window function pagination mode.
         # If it used SKIP/LIMIT, it would ruin result sets because "LIMIT 50" applies to the whole result set!
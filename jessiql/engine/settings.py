@@ -24,6 +24,19 @@ class QuerySettings:
     # The max number of items you get, regardless of the limit
     max_limit: Optional[int] = None
 
+    # How many related objects to load with one IN(...) query, when this model is loaded as a relation
+    # Default: $JESSIQL_SELECTIN_CHUNKSIZE, or `JSelectInLoader.CHUNKSIZE`. Long lists mean fewer roundtrips, but some databases plan them poorly.
+    selectin_chunksize: Optional[int] = None
+
+    # PostgreSQL only: when this model is loaded as a relation, use `= ANY(:array)` instead of `IN(...)`
+    # The primary keys go as one array parameter: long lists won't bloat the query. Goes well with a larger `selectin_chunksize`.
+    # Only applies to single-column keys.
+    selectin_pg_any_array: bool = False
+
+    # When this model is loaded as a relation, fetch its rows from a server-side cursor, in batches
+    # Only helps with huge results. Costs extra roundtrips; with psycopg2, it won't work on an AUTOCOMMIT connection.
+    selectin_stream_results: bool = False
+
     # Field names rewriter
     rewriter: Optional[Rewriter] = None
 
@@ -15,6 +15,8 @@ SAModelOrAlias = Union[SAModel, sa.orm.util.AliasedClass]
 SAInstance = object
 
 # Annotation for dict rows (result rows returned as dicts)
+# NOTE: it has to be a real, mutable `dict`, not a lightweight row object with a fixed set of attributes:
+# loaders add relationship keys to it, @property handlers add computed keys, and users get it as their result
 SARowDict = dict
 
 # An SqlAlchemy attribute
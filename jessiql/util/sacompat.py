@@ -19,6 +19,13 @@ def add_columns_if_missing(stmt: sa.sql.Select, columns: abc.Iterable[Union[sa.C
     # NOTE: in SqlAlchemy 1.4.23 add_columns() does not do de-duplication anymore.
     # If this breaks your code like it broke jessiql, use this function
 
+    # Resolve ORM attributes (e.g. `User.id`) into columns: `contains_column()` won't recognize `User.id` as `users.id`.
+    # Otherwise, a column added by a loader (e.g. a primary key) would get selected twice, and come back as "id__1"
+    columns = [
+        col.__clause_element__() if hasattr(col, '__clause_element__') else col
+        for col in columns
+    ]
+
     if SA_13:
         new_columns = (col for col in columns if not stmt.columns.contains_column(col))
     else:
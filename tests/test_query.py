@@ -1,11 +1,17 @@
 import pytest
+from contextlib import nullcontext
+from typing import Optional
 import sqlalchemy as sa
 import sqlalchemy.orm
 
-from jessiql import QueryObjectDict, Query
+from jessiql import QueryObjectDict, Query, QuerySettings, loads_attributes
+from jessiql.engine.jselectinloader import JSelectInLoader
+from jessiql.testing.table_data import insert
+from jessiql.testing.recreate_tables import created_tables
+from jessiql.testing.stmt_text import stmt2sql
 from jessiql.util import sacompat
-from .util.models import IdManyFieldsMixin
-from .util.test_queries import assert_query_statements_lines
+from .util.models import IdManyFieldsMixin, id_manyfields
+from .util.test_queries import assert_query_statements_lines, executed_statements
 
 
 @pytest.mark.parametrize(('query_object', 'expected_columns',), [
@@ -66,3 +72,319 @@ def test_query_customize_statements(connection: sa.engine.Connection, query_obje
 
     # SQL
     assert_query_statements_lines(q, *expected_columns)
+
+
+@pytest.fixture()
+def users_articles(connection: sa.engine.Connection) -> tuple[type, type]:
+    """ Models and data for relation tests: User.articles (One-To-Many) and Article.author (Many-To-One) """
+    # Models
+    Base = sacompat.declarative_base()
+
+    class User(IdManyFieldsMixin, Base):
+        __tablename__ = 'u'
+
+        articles = sa.orm.relationship('Article', back_populates='author')
+
+    class Article(IdManyFieldsMixin, Base):
+        __tablename__ = 'a'
+
+        user_id = sa.Column(sa.ForeignKey(User.id))
+        author = sa.orm.relationship(User, back_populates='articles')
+
+    # Data
+    with created_tables(connection, Base):
+        insert(connection, User,
+            id_manyfields('u', 1),
+            id_manyfields('u', 2),
+            # user with no articles
+            id_manyfields('u', 3),
+        )
+        insert(connection, Article,
+            # 2 articles from User(id=1)
+            id_manyfields('a', 1, user_id=1),
+            id_manyfields('a', 2, user_id=1),
+            # 1 article from User(id=2)
+            id_manyfields('a', 3, user_id=2),
+            # article with no user
+            id_manyfields('a', 4, user_id=None),
+        )
+
+        yield User, Article
+
+
+def test_query_relation_chunksize(connection: sa.engine.Connection, users_articles: tuple[type, type], monkeypatch: pytest.MonkeyPatch):
+    """ Test QuerySettings.selectin_chunksize: related objects loaded in many small chunks """
+    User, Article = users_articles
+
+    # One-To-Many: one IN(...) query per user
+    settings = QuerySettings(relations={'articles': QuerySettings(selectin_chunksize=1)})
+    q = Query(dict(select=[{'articles': dict(select=['id'])}]), User, settings)
+    with executed_statements(connection) as executed:
+        assert q.fetchall(connection) == [
+            {'id': 1, 'articles': [{'user_id': 1, 'id': 1}, {'user_id': 1, 'id': 2}]},
+            {'id': 2, 'articles': [{'user_id': 2, 'id': 3}]},
+            {'id': 3, 'articles': []},
+        ]
+    assert [params['primary_keys'] for stmt, params in executed[1:]] == [[1], [2], [3]]
+
+    # Many-To-One: one IN(...) query per author
+    settings = QuerySettings(relations={'author': QuerySettings(selectin_chunksize=1)})
+    q = Query(dict(select=['id', {'author': dict(select=['id', 'a'])}]), Article, settings)
+    with executed_statements(connection) as executed:
+        assert q.fetchall(connection) == [
+            {'id': 1, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+            {'id': 2, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+            {'id': 3, 'user_id': 2, 'author': {'id': 2, 'a': 'u-2-a'}},
+            {'id': 4, 'user_id': None, 'author': None},
+        ]
+    assert [params['primary_keys'] for stmt, params in executed[1:]] == [[1], [2]]
+
+    # Default chunk size: one IN(...) query for everything
+    q = Query(dict(select=[{'articles': dict(select=['id'])}]), User)
+    with executed_statements(connection) as executed:
+        q.fetchall(connection)
+    assert [params['primary_keys'] for stmt, params in executed[1:]] == [[1, 2, 3]]
+
+    # Environment variable: overrides the default, read when the query is executed
+    monkeypatch.setenv('JESSIQL_SELECTIN_CHUNKSIZE', '2')
+    q = Query(dict(select=[{'articles': dict(select=['id'])}]), User)
+    with executed_statements(connection) as executed:
+        q.fetchall(connection)
+    assert [params['primary_keys'] for stmt, params in executed[1:]] == [[1, 2], [3]]
+
+    # Malformed environment variable: fails with a message that names it
+    monkeypatch.setenv('JESSIQL_SELECTIN_CHUNKSIZE', 'many')
+    with pytest.raises(ValueError, match='JESSIQL_SELECTIN_CHUNKSIZE'):
+        Query(dict(select=[{'articles': dict(select=['id'])}]), User).fetchall(connection)
+    monkeypatch.delenv('JESSIQL_SELECTIN_CHUNKSIZE')
+
+    # Zero chunk size: rejected, not replaced with the default. So is `True`, which would pass for an `int`
+    for chunksize in (0, True):
+        settings = QuerySettings(relations={'author': QuerySettings(selectin_chunksize=chunksize)})
+        with pytest.raises(ValueError):
+            Query(dict(select=['id', {'author': dict(select=['a'])}]), Article, settings).fetchall(connection)
+
+
+def test_query_relation_pg_any_array(connection: sa.engine.Connection, users_articles: tuple[type, type]):
+    """ Test QuerySettings.selectin_pg_any_array: related objects loaded with `= ANY(:array)` """
+    User, Article = users_articles
+
+    # One-To-Many
+    settings = QuerySettings(relations={'articles': QuerySettings(selectin_pg_any_array=True)})
+    q = Query(dict(select=[{'articles': dict(select=['id'])}]), User, settings)
+    assert_query_statements_lines(q, 'WHERE a.user_id = ANY (')
+    assert q.fetchall(connection) == [
+        {'id': 1, 'articles': [{'user_id': 1, 'id': 1}, {'user_id': 1, 'id': 2}]},
+        {'id': 2, 'articles': [{'user_id': 2, 'id': 3}]},
+        {'id': 3, 'articles': []},
+    ]
+
+    # Many-To-One
+    settings = QuerySettings(relations={'author': QuerySettings(selectin_pg_any_array=True)})
+    q = Query(dict(select=['id', {'author': dict(select=['a'])}]), Article, settings)
+    assert_query_statements_lines(q, 'WHERE u.id = ANY (')
+    assert q.fetchall(connection) == [
+        {'id': 1, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+        {'id': 2, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+        {'id': 3, 'user_id': 2, 'author': {'id': 2, 'a': 'u-2-a'}},
+        {'id': 4, 'user_id': None, 'author': None},
+    ]
+
+
+def test_query_relation_sorted_keys(connection: sa.engine.Connection, users_articles: tuple[type, type], monkeypatch: pytest.MonkeyPatch):
+    """ Test JSelectInLoader.SORTED_KEYS: Many-To-One keys go into IN(...) sorted, not in the order they were met """
+    User, Article = users_articles
+
+    # Articles in reverse order: their authors are met as User(id=2), then User(id=1)
+    q = Query(dict(select=['id', {'author': dict(select=['a'])}], sort=['id-']), Article)
+
+    # By default: the order they were met in
+    with executed_statements(connection) as executed:
+        q.fetchall(connection)
+    assert [params['primary_keys'] for stmt, params in executed[1:]] == [[2, 1]]
+
+    # Sorted
+    monkeypatch.setattr(JSelectInLoader, 'SORTED_KEYS', True)
+    with executed_statements(connection) as executed:
+        assert q.fetchall(connection) == [
+            {'id': 4, 'user_id': None, 'author': None},
+            {'id': 3, 'user_id': 2, 'author': {'id': 2, 'a': 'u-2-a'}},
+            {'id': 2, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+            {'id': 1, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+        ]
+    assert [params['primary_keys'] for stmt, params in executed[1:]] == [[1, 2]]
+
+
+def test_query_relation_stream_results(connection: sa.engine.Connection, users_articles: tuple[type, type], monkeypatch: pytest.MonkeyPatch):
+    """ Test QuerySettings.selectin_stream_results: related rows fetched from a server-side cursor """
+    User, Article = users_articles
+
+    # Off by default
+    q = Query(dict(select=[{'articles': dict(select=['id'])}]), User)
+    with executed_statements(connection) as executed:
+        q.fetchall(connection)
+    related_stmt, params = executed[1]
+    assert 'stream_results' not in related_stmt.get_execution_options()
+    assert 'max_row_buffer' not in related_stmt.get_execution_options()
+
+    # On: every chunk is streamed. Fetch rows one by one: they must still be grouped correctly
+    monkeypatch.setattr(JSelectInLoader, 'YIELD_PER', 1)
+    settings = QuerySettings(relations={'articles': QuerySettings(selectin_stream_results=True, selectin_chunksize=2)})
+    q = Query(dict(select=[{'articles': dict(select=['id'])}]), User, settings)
+
+    # psycopg2 only has server-side cursors within a transaction. Future connections have already begun one.
+    with (nullcontext() if connection.in_transaction() else connection.begin()):
+        with executed_statements(connection) as executed:
+            assert q.fetchall(connection) == [
+                {'id': 1, 'articles': [{'user_id': 1, 'id': 1}, {'user_id': 1, 'id': 2}]},
+                {'id': 2, 'articles': [{'user_id': 2, 'id': 3}]},
+                {'id': 3, 'articles': []},
+            ]
+
+    assert [params['primary_keys'] for stmt, params in executed[1:]] == [[1, 2], [3]]
+    for related_stmt, params in executed[1:]:
+        assert related_stmt.get_execution_options()['stream_results'] is True
+        assert related_stmt.get_execution_options()['max_row_buffer'] == 1
+
+
+def test_query_relation_null_foreign_keys(connection: sa.engine.Connection, users_articles: tuple[type, type]):
+    """ Test Many-To-One where every foreign key is NULL: there's nothing to load, but the relation is still populated """
+    User, Article = users_articles
+
+    # Only load articles with no user
+    q = Query(dict(select=['id', {'author': dict(select=['a'])}], filter={'user_id': None}), Article)
+    assert q.fetchall(connection) == [
+        {'id': 4, 'user_id': None, 'author': None},
+    ]
+
+
+@pytest.mark.parametrize(('model', 'query_object', 'expected_query_lines', 'expected_results'), [
+    # Many-To-One: select the target's primary key. The loader adds it too.
+    ('Article', dict(select=['id', {'author': dict(select=['id', 'a'])}]), [
+        'SELECT u.id, u.a',
+    ], [
+        {'id': 1, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+        {'id': 2, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+        {'id': 3, 'user_id': 2, 'author': {'id': 2, 'a': 'u-2-a'}},
+        {'id': 4, 'user_id': None, 'author': None},
+    ]),
+    # Many-To-One, with a limit: the statement is wrapped into a subquery
+    ('Article', dict(select=['id', {'author': dict(select=['id', 'a'], limit=1)}]), [
+        'SELECT anon_1.id, anon_1.a',
+        'SELECT u.id AS id, u.a AS a, row_number() OVER (PARTITION BY u.id) AS __group_row_n',
+    ], [
+        {'id': 1, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+        {'id': 2, 'user_id': 1, 'author': {'id': 1, 'a': 'u-1-a'}},
+        {'id': 3, 'user_id': 2, 'author': {'id': 2, 'a': 'u-2-a'}},
+        {'id': 4, 'user_id': None, 'author': None},
+    ]),
+    # One-To-Many: select the foreign key. The loader adds it too.
+    ('User', dict(select=[{'articles': dict(select=['user_id'])}]), [
+        'SELECT a.user_id',
+    ], [
+        {'id': 1, 'articles': [{'user_id': 1}, {'user_id': 1}]},
+        {'id': 2, 'articles': [{'user_id': 2}]},
+        {'id': 3, 'articles': []},
+    ]),
+])
+def test_query_relation_selects_loader_columns(connection: sa.engine.Connection, users_articles: tuple[type, type], model: str, query_object: QueryObjectDict, expected_query_lines: list[str], expected_results: list[dict]):
+    """ Test relations that select a column that the loader adds anyway: it must only be selected once """
+    User, Article = users_articles
+    Model = locals()[model]
+
+    # SQL: no duplicate columns, like "u.id AS id__1"
+    q = Query(query_object, Model)
+    assert_query_statements_lines(q, *expected_query_lines)
+    assert '__1' not in '\n'.join(map(stmt2sql, q.all_statements()))
+
+    # Results: no duplicate keys
+    assert q.fetchall(connection) == expected_results
+
+
+def test_query_relation_one_to_one_property(connection: sa.engine.Connection):
+    """ Test One-To-One loaded via the parent, with a @property selected: it's computed for every loaded row """
+    # Models
+    Base = sacompat.declarative_base()
+
+    class User(IdManyFieldsMixin, Base):
+        __tablename__ = 'u'
+
+        profile = sa.orm.relationship('Profile', uselist=False, back_populates='user')
+
+    class Profile(IdManyFieldsMixin, Base):
+        __tablename__ = 'p'
+
+        user_id = sa.Column(sa.ForeignKey(User.id))
+        user = sa.orm.relationship(User, back_populates='profile')
+
+        @property
+        @loads_attributes('a', 'b')
+        def ab(self):
+            return ' '.join((self.a, self.b))
+
+    # Data
+    with created_tables(connection, Base):
+        insert(connection, User,
+            id_manyfields('u', 1),
+            # user with no profile
+            id_manyfields('u', 2),
+        )
+        insert(connection, Profile,
+            id_manyfields('p', 1, user_id=1),
+        )
+
+        q = Query(dict(select=[{'profile': dict(select=['ab'])}]), User)
+        assert q.fetchall(connection) == [
+            {'id': 1, 'profile': {'user_id': 1, 'a': 'p-1-a', 'b': 'p-1-b', 'ab': 'p-1-a p-1-b'}},
+            {'id': 2, 'profile': None},
+        ]
+
+
+
+@pytest.mark.parametrize('omit_join', [
+    # SqlAlchemy joins uselist=True Many-To-One: loaded via the parent
+    None,
+    # Force the loader to load it via the child. SqlAlchemy warns that this is not supported, but the loader must cope.
+    pytest.param(True, marks=pytest.mark.filterwarnings('ignore:setting omit_join to True is not supported')),
+])
+def test_query_relation_many_to_one_uselist(connection: sa.engine.Connection, omit_join: Optional[bool]):
+    """ Test Many-To-One with uselist=True: a key with no related row, or a NULL key, gets an empty list """
+    # Models
+    Base = sacompat.declarative_base()
+
+    class User(IdManyFieldsMixin, Base):
+        __tablename__ = 'u'
+
+    class Article(IdManyFieldsMixin, Base):
+        __tablename__ = 'a'
+
+        # No foreign key constraint: an article may refer to a user that does not exist
+        user_id = sa.Column(sa.Integer)
+        authors = sa.orm.relationship(User, primaryjoin=lambda: sa.orm.foreign(Article.user_id) == User.id,
+                                      uselist=True, viewonly=True, omit_join=omit_join)
+
+    # Data
+    with created_tables(connection, Base):
+        insert(connection, User,
+            id_manyfields('u', 1),
+        )
+        insert(connection, Article,
+            id_manyfields('a', 1, user_id=1),
+            # dangling foreign key
+            id_manyfields('a', 2, user_id=99),
+            # NULL foreign key
+            id_manyfields('a', 3, user_id=None),
+        )
+
+        q = Query(dict(select=['id', {'authors': dict(select=['id', 'a'])}]), Article)
+        assert q.fetchall(connection) == [
+            {'id': 1, 'user_id': 1, 'authors': [{'id': 1, 'a': 'u-1-a'}]},
+            {'id': 2, 'user_id': 99, 'authors': []},
+            {'id': 3, 'user_id': None, 'authors': []},
+        ]
+
+        # Every foreign key is NULL: there's nothing to load, but the relation is still populated
+        q = Query(dict(select=['id', {'authors': dict(select=['id', 'a'])}], filter={'user_id': None}), Article)
+        assert q.fetchall(connection) == [
+            {'id': 3, 'user_id': None, 'authors': []},
+        ]
@@ -1,4 +1,6 @@
 import sqlalchemy as sa
+from collections import abc
+from contextlib import contextmanager
 from typing import Union
 
 from jessiql.engine import Query
@@ -99,3 +101,25 @@ def assert_selected_columns(stmt: Union[str, sa.sql.ClauseElement], *expected_co
 
     # Done
     return stmt
+
+
+@contextmanager
+def executed_statements(connection: sa.engine.Connection) -> abc.Iterator[list[tuple[sa.sql.ClauseElement, dict]]]:
+    """ Collect statements executed on the connection, with their parameters
+
+    Example:
+        with executed_statements(connection) as executed:
+            q.fetchall(connection)
+        assert len(executed) == 2
+    """
+    executed: list[tuple[sa.sql.ClauseElement, dict]] = []
+
+    def before_execute(conn, clauseelement, multiparams, params, execution_options=None):
+        # SA 1.3 gives the parameters dict in `multiparams`, and no `execution_options`; SA 1.4 gives it in `params`
+        executed.append((clauseelement, multiparams[0] if multiparams else params))
+
+    sa.event.listen(connection, 'before_execute', before_execute)
+    try:
+        yield executed
+    finally:
+        sa.event.remove(connection, 'before_execute', before_execute)